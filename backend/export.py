@@ -0,0 +1,402 @@
+# Lightweight HTTP export service so other consumers can read the processed
+# wildfire data without scraping the Streamlit UI.
+#
+# Run alongside the app with:  python -m backend.export [port]
+
+import datetime
+import gzip
+import hashlib
+import json
+import math
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+
+from backend.classes import EventUtils
+
+# Default port, one above Streamlit's default of 8501
+EXPORT_PORT = 8502
+
+# Seconds between re-fetches of the API data
+REFRESH_INTERVAL = 600
+
+# Seconds before a fetch of the API data is abandoned
+REQUEST_TIMEOUT = 60
+
+# Attributes that depend on the running process rather than on the dataset
+EXCLUDED_FIELDS = ("CurrentDate",)
+
+
+class ExportResource():
+    """
+    Class to store a single serialized export response.
+
+    The body is serialized and gzipped once when the resource is created, so
+    serving a request only means writing out bytes that already exist. The
+    entity tag is a hash of the body, so it only changes when the bytes do.
+
+    Attributes
+    ----------
+    content_type: str
+      MIME type of the body
+    body: bytes
+      Serialized, uncompressed body
+    gzip_body: bytes
+      Precompressed copy of body
+    etag: str
+      Entity tag of the uncompressed body. The gzip representation is
+      tagged with the same value plus a "-gzip" suffix.
+
+    Methods
+    -------
+    __init__(content_type, body)
+      init function
+    get_body(use_gzip) -> bytes
+      returns the body for the negotiated encoding
+    get_etag(use_gzip) -> str
+      returns the entity tag for the negotiated encoding
+    matches(if_none_match) -> bool
+      returns True if the If-None-Match header matches this resource
+    """
+
+    def __init__(self, content_type, body):
+        self.content_type = content_type
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+    def get_body(self, use_gzip):
+        if use_gzip:
+            return self.gzip_body
+        return self.body
+
+    def get_etag(self, use_gzip):
+        if use_gzip:
+            return f'"{self.etag}-gzip"'
+        return f'"{self.etag}"'
+
+    def matches(self, if_none_match):
+        """
+        matches() checks an If-None-Match header against this resource using
+        weak comparison, so a client holding either encoding is still up to date.
+        """
+        if if_none_match == None:
+            return False
+
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            if tag.endswith("-gzip"):
+                tag = tag[:-len("-gzip")]
+            if tag == self.etag:
+                return True
+        return False
+
+
+class ExportCache():
+    """
+    Class to store the serialized export resources for one dataset version.
+
+    Resources are only rebuilt when update() is called with a new version,
+    so repeated polls reuse the same bytes and entity tags.
+
+    Attributes
+    ----------
+    version: str
+      Version of the dataset the resources were built from
+    resources: dict
+      Maps a request path to its ExportResource
+
+    Methods
+    -------
+    __init__()
+      init function
+    update(version, stack, stats)
+      rebuilds the resources if version differs from the cached one
+    get(path) -> ExportResource
+      returns the resource for a path, or None if there is none
+    """
+
+    def __init__(self):
+        self.version = None
+        self.resources = {}
+
+    def update(self, version, stack, stats):
+        """
+        update() serializes the processed fires, the top priority fires and
+        the stats. Nothing is done if the version is already cached.
+
+        The new resources are built first and then swapped in with a single
+        assignment, so requests being served never see a partial set.
+        """
+        if version == self.version:
+            return
+
+        # Same ordering as fires_dict and top_three in backend/middle.py.
+        # Slicing instead of stack.get_top_three() also works for stacks
+        # with fewer than three fires.
+        fires = [ExportUtils.export_dict(event)
+                 for event in reversed(stack.events)]
+        top = fires[:3]
+
+        payloads = {
+            "/fires": ("application/json", fires),
+            "/fires.geojson": ("application/geo+json", ExportUtils.to_geojson(fires)),
+            "/top": ("application/json", top),
+            "/top.geojson": ("application/geo+json", ExportUtils.to_geojson(top)),
+            "/stats": ("application/json", stats),
+            "/version": ("application/json", {"version": version}),
+        }
+
+        resources = {}
+        for path, (content_type, payload) in payloads.items():
+            resources[path] = ExportResource(
+                content_type, ExportUtils.to_json(payload))
+
+        self.resources = resources
+        self.version = version
+
+    def get(self, path):
+        return self.resources.get(path)
+
+
+class ExportUtils():
+    """
+    Class that contains static helper methods used by the export service.
+
+    Methods
+    -------
+    dataset_version(data) -> str
+      Returns a hash identifying the raw API data
+    export_dict(event) -> dict
+      Returns the dict representation of an event without process-local fields
+    to_json(obj) -> bytes
+      Serializes obj to compact UTF-8 JSON
+    to_geojson(fires) -> dict
+      Builds a GeoJSON FeatureCollection of points from fire dicts
+    accepts_gzip(accept_encoding) -> bool
+      Returns True if the Accept-Encoding header allows gzip
+    """
+
+    @staticmethod
+    def dataset_version(data):
+        """
+        dataset_version() hashes the raw data received from the API, so the
+        export only changes when the source data does.
+        """
+        raw = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def export_dict(event):
+        """
+        export_dict() returns event.return_dict() without process-local fields.
+        Non-finite numbers (e.g. NaN acres or coordinates) become None, since
+        they are not valid JSON.
+        """
+        fire = event.return_dict()
+        for field in EXCLUDED_FIELDS:
+            fire.pop(field, None)
+        for key, value in fire.items():
+            if isinstance(value, float) and not math.isfinite(value):
+                fire[key] = None
+        return fire
+
+    @staticmethod
+    def _default(obj):
+        if isinstance(obj, (datetime.datetime, datetime.date)):
+            return obj.isoformat()
+        # numpy scalars, e.g. coordinates from EventUtils.get_coordinates()
+        if isinstance(obj, np.generic):
+            value = obj.item()
+            if isinstance(value, float) and not math.isfinite(value):
+                return None
+            return value
+        raise TypeError(
+            f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    @staticmethod
+    def to_json(obj):
+        return json.dumps(obj, default=ExportUtils._default, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def to_geojson(fires):
+        """
+        to_geojson() builds a FeatureCollection with one point per fire at
+        its initial coordinates. Fires without coordinates get a null geometry.
+        """
+        features = []
+        for fire in fires:
+            lat = fire["InitialLatitude"]
+            lon = fire["InitialLongitude"]
+            geometry = None
+            if lat != None and lon != None:
+                geometry = {"type": "Point", "coordinates": [lon, lat]}
+
+            properties = {key: value for key, value in fire.items()
+                          if key not in ("InitialLatitude", "InitialLongitude")}
+            features.append({"type": "Feature", "id": fire["ID"],
+                             "geometry": geometry, "properties": properties})
+
+        return {"type": "FeatureCollection", "features": features}
+
+    @staticmethod
+    def accepts_gzip(accept_encoding):
+        """
+        accepts_gzip() parses every coding of an Accept-Encoding header into a
+        name -> q map. An explicit gzip entry takes precedence over "*".
+        """
+        if accept_encoding == None:
+            return False
+
+        qualities = {}
+        for coding in accept_encoding.split(","):
+            name, *params = coding.split(";")
+            name = name.strip().lower()
+            if name == "":
+                continue
+
+            quality = 1.0
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip().lower() == "q":
+                    try:
+                        quality = float(value.strip())
+                    except ValueError:
+                        quality = 0.0
+            qualities[name] = quality
+
+        if "gzip" in qualities:
+            return qualities["gzip"] > 0
+        if "*" in qualities:
+            return qualities["*"] > 0
+        return False
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the resources of the server's ExportCache.
+    Supports GET and HEAD, gzip content negotiation and conditional GET
+    through If-None-Match.
+    """
+
+    def do_GET(self):
+        self.send_resource(include_body=True)
+
+    def do_HEAD(self):
+        self.send_resource(include_body=False)
+
+    def send_resource(self, include_body):
+        path = urlsplit(self.path).path.rstrip("/") or "/"
+        resource = self.server.cache.get(path)
+
+        if resource == None:
+            body = ExportUtils.to_json({"error": "not found",
+                                        "paths": sorted(self.server.cache.resources)})
+            self.send_response(404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if include_body:
+                self.wfile.write(body)
+            return
+
+        use_gzip = ExportUtils.accepts_gzip(
+            self.headers.get("Accept-Encoding"))
+
+        if resource.matches(self.headers.get("If-None-Match")):
+            self.send_response(304)
+            self.send_common_headers(resource, use_gzip)
+            self.end_headers()
+            return
+
+        body = resource.get_body(use_gzip)
+        self.send_response(200)
+        self.send_common_headers(resource, use_gzip)
+        self.send_header("Content-Type", resource.content_type)
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def send_common_headers(self, resource, use_gzip):
+        self.send_header("ETag", resource.get_etag(use_gzip))
+        # Clients may cache but must revalidate, which is a cheap 304
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+
+
+def make_server(cache, port=EXPORT_PORT, host=""):
+    """
+    make_server() creates a threaded HTTP server serving the given ExportCache.
+    """
+    server = ThreadingHTTPServer((host, port), ExportHandler)
+    server.cache = cache
+    return server
+
+
+def refresh(cache, api, interval=REFRESH_INTERVAL, stop=None):
+    """
+    refresh() re-fetches the API every interval seconds and rebuilds the
+    cache when the dataset version changes. Failed fetches are skipped, so
+    the last good data keeps being served. Runs until stop is set.
+    """
+    if stop == None:
+        stop = threading.Event()
+
+    while not stop.wait(interval):
+        try:
+            data = requests.get(api, timeout=REQUEST_TIMEOUT).json()
+        except (requests.RequestException, ValueError) as error:
+            print(f"Export refresh failed: {error}")
+            continue
+
+        version = ExportUtils.dataset_version(data)
+        if version == cache.version:
+            continue
+
+        # A malformed dataset should not stop the refresh thread for good
+        try:
+            fires = EventUtils.load_fires(data)
+            stats = EventUtils.get_stats(fires)
+            stack = EventUtils.load_stack(fires)
+            cache.update(version, stack, stats)
+        except Exception as error:
+            print(f"Export refresh failed: {error}")
+
+
+def start_refresh(cache, api, interval=REFRESH_INTERVAL):
+    """
+    start_refresh() runs refresh() in a daemon thread and returns the
+    threading.Event used to stop it.
+    """
+    stop = threading.Event()
+    thread = threading.Thread(target=refresh, args=(cache, api, interval, stop),
+                              daemon=True)
+    thread.start()
+    return stop
+
+
+if __name__ == "__main__":
+    from backend.api import API, data
+    from backend.middle import stack, stats
+
+    cache = ExportCache()
+    cache.update(ExportUtils.dataset_version(data), stack, stats)
+    start_refresh(cache, API)
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else EXPORT_PORT
+    server = make_server(cache, port)
+    print(f"Serving wildfire export on port {port}: {', '.join(sorted(cache.resources))}")
+    server.serve_forever()
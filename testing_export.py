@@ -0,0 +1,109 @@
+# Export service testing
+"""
+The export service is checked with a small fake stack and a local server.
+Unlike testing.py, this file does not import backend.api, so it runs
+without access to the live API.
+"""
+import datetime
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+
+from backend.classes import EventStack
+from backend.export import ExportCache, ExportUtils, make_server
+
+
+class FakeEvent():
+    def __init__(self, ID, Acres=None):
+        self.ID = ID
+        self.Acres = 100 * ID if Acres == None else Acres
+
+    def return_dict(self):
+        return {'ID': self.ID, 'IncidentName': f"Fake Fire {self.ID}", 'Acres': self.Acres,
+                'CurrentDate': datetime.datetime.now(), 'InitialLatitude': 40.0, 'InitialLongitude': -120.0}
+
+
+def fake_stack(size=4):
+    stack = EventStack()
+    for ID in range(1, size + 1):
+        stack.push(FakeEvent(ID))
+    return stack
+
+
+def request(url, headers=None):
+    try:
+        response = urllib.request.urlopen(
+            urllib.request.Request(url, headers=headers or {}))
+    except urllib.error.HTTPError as response:
+        return response.code, response.headers, response.read()
+    return response.status, response.headers, response.read()
+
+
+# Same version -> same entity tag, even from a freshly built cache
+cache = ExportCache()
+cache.update("v1", fake_stack(), {"total_fires": 4})
+etag = cache.get("/fires").etag
+
+cache.update("v1", fake_stack(), {"total_fires": 4})
+other_cache = ExportCache()
+other_cache.update("v1", fake_stack(), {"total_fires": 4})
+assert cache.get("/fires").etag == etag == other_cache.get("/fires").etag
+assert b"CurrentDate" not in cache.get("/fires").body
+
+# Stacks with fewer than three fires still build every resource
+short_cache = ExportCache()
+short_cache.update("short", fake_stack(2), {"total_fires": 2})
+assert [fire["ID"] for fire in json.loads(short_cache.get("/top").body)] == [2, 1]
+
+# NaN values are exported as null, keeping the output valid JSON
+nan_stack = EventStack()
+nan_stack.push(FakeEvent(1, Acres=float("nan")))
+nan_cache = ExportCache()
+nan_cache.update("nan", nan_stack, {"total_fires": 1})
+assert json.loads(nan_cache.get("/fires.geojson").body)[
+    "features"][0]["properties"]["Acres"] == None
+
+server = make_server(cache, 0, "127.0.0.1")
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f"http://127.0.0.1:{server.server_port}"
+
+status, headers, plain_body = request(url + "/fires")
+assert status == 200
+plain_tag = headers["ETag"]
+
+status, headers, gzip_body = request(
+    url + "/fires", {"Accept-Encoding": "gzip"})
+assert status == 200 and headers["Content-Encoding"] == "gzip"
+assert gzip.decompress(gzip_body) == plain_body
+gzip_tag = headers["ETag"]
+
+for tag in (plain_tag, gzip_tag):
+    status, headers, body = request(url + "/fires", {"If-None-Match": tag})
+    assert status == 304 and body == b""
+
+status, headers, body = request(url + "/top")
+assert status == 200
+assert [fire["ID"] for fire in json.loads(body)] == [4, 3, 2]
+
+status, headers, body = request(url + "/fires.geojson")
+assert status == 200 and headers["Content-Type"] == "application/geo+json"
+geojson = json.loads(body)
+assert geojson["type"] == "FeatureCollection" and len(geojson["features"]) == 4
+
+status, headers, body = request(url + "/missing")
+assert status == 404
+
+# A new dataset version means a new entity tag and a 200 for the old tag
+cache.update("v2", fake_stack(5), {"total_fires": 5})
+status, headers, body = request(url + "/fires", {"If-None-Match": plain_tag})
+assert status == 200 and headers["ETag"] != plain_tag
+assert len(json.loads(body)) == 5
+
+assert not ExportUtils.accepts_gzip("gzip;Q=0")
+assert ExportUtils.accepts_gzip("*;q=0, gzip")
+assert not ExportUtils.accepts_gzip("gzip;level=1;q=0")
+
+server.shutdown()
+print("Export service checks passed")